@@ -4,10 +4,12 @@
 
 """Charmed operator for the SD-Core AUSF service."""
 
+import hashlib
 import logging
-from ipaddress import IPv4Address
+from functools import cached_property, wraps
+from operator import attrgetter
 from subprocess import check_output
-from typing import Optional
+from typing import Any, Callable, Optional, Set, cast
 
 from charms.observability_libs.v1.kubernetes_service_patch import (  # type: ignore[import]
     KubernetesServicePatch,
@@ -20,12 +22,11 @@ from charms.tls_certificates_interface.v2.tls_certificates import (  # type: ign
     generate_csr,
     generate_private_key,
 )
-from jinja2 import Environment, FileSystemLoader
 from lightkube.models.core_v1 import ServicePort
 from ops.charm import CharmBase, EventBase
 from ops.main import main
 from ops.model import ActiveStatus, BlockedStatus, WaitingStatus
-from ops.pebble import Layer, PathError
+from ops.pebble import APIError, Layer, PathError
 
 logger = logging.getLogger(__name__)
 
@@ -33,24 +34,144 @@ AUSF_GROUP_ID = "ausfGroup001"
 SBI_PORT = 29509
 CONFIG_DIR = "/free5gc/config"
 CONFIG_FILE_NAME = "ausfcfg.conf"
-CONFIG_TEMPLATE_DIR = "src/templates/"
-CONFIG_TEMPLATE_NAME = "ausfcfg.conf.j2"
 CERTS_DIR_PATH = "/support/TLS"  # Certificate paths are hardcoded in AUSF code
 PRIVATE_KEY_NAME = "ausf.key"
 CSR_NAME = "ausf.csr"
 CERTIFICATE_NAME = "ausf.pem"
 CERTIFICATE_COMMON_NAME = "ausf.sdcore"
+_PRIV_KEY_PATH = f"{CERTS_DIR_PATH}/{PRIVATE_KEY_NAME}"
+_CSR_PATH = f"{CERTS_DIR_PATH}/{CSR_NAME}"
+_CERT_PATH = f"{CERTS_DIR_PATH}/{CERTIFICATE_NAME}"
+_CONFIG_PATH = f"{CONFIG_DIR}/{CONFIG_FILE_NAME}"
+_UNIT_GET_PRIVATE_ADDRESS = ("unit-get", "private-address")
+_TLS_ARTIFACT_PATHS = {
+    PRIVATE_KEY_NAME: _PRIV_KEY_PATH,
+    CSR_NAME: _CSR_PATH,
+    CERTIFICATE_NAME: _CERT_PATH,
+}
+
+_CONFIG_TEMPLATE = """configuration:
+  groupId: {ausf_group_id}
+  nrfUri: {nrf_url}
+  sbi:
+    bindingIPv4: 0.0.0.0
+    port: {sbi_port}
+    registerIPv4: {ausf_ip}
+    scheme: {scheme}
+  serviceNameList:
+    - nausf-auth
+info:
+  description: AUSF initial local configuration
+  version: 1.0.0
+logger:
+  AMF:
+    ReportCaller: false
+    debugLevel: info
+  AUSF:
+    ReportCaller: false
+    debugLevel: info
+  Aper:
+    ReportCaller: false
+    debugLevel: info
+  CommonConsumerTest:
+    ReportCaller: false
+    debugLevel: info
+  FSM:
+    ReportCaller: false
+    debugLevel: info
+  MongoDBLibrary:
+    ReportCaller: false
+    debugLevel: info
+  N3IWF:
+    ReportCaller: false
+    debugLevel: info
+  NAS:
+    ReportCaller: false
+    debugLevel: info
+  NGAP:
+    ReportCaller: false
+    debugLevel: info
+  NRF:
+    ReportCaller: false
+    debugLevel: info
+  NamfComm:
+    ReportCaller: false
+    debugLevel: info
+  NamfEventExposure:
+    ReportCaller: false
+    debugLevel: info
+  NsmfPDUSession:
+    ReportCaller: false
+    debugLevel: info
+  NudrDataRepository:
+    ReportCaller: false
+    debugLevel: info
+  OpenApi:
+    ReportCaller: false
+    debugLevel: info
+  PCF:
+    ReportCaller: false
+    debugLevel: info
+  PFCP:
+    ReportCaller: false
+    debugLevel: info
+  PathUtil:
+    ReportCaller: false
+    debugLevel: info
+  SMF:
+    ReportCaller: false
+    debugLevel: info
+  UDM:
+    ReportCaller: false
+    debugLevel: info
+  UDR:
+    ReportCaller: false
+    debugLevel: info
+  WEBUI:
+    ReportCaller: false
+    debugLevel: info"""
+
+
+def _require_container(handler: Callable) -> Callable:
+    """Defers the event instead of calling the handler when the container is unreachable."""
+
+    @wraps(handler)
+    def wrapper(self: "AUSFOperatorCharm", event: EventBase, *args: Any, **kwargs: Any) -> None:
+        if not self._container_is_reachable(event):
+            event.defer()
+            return
+        handler(self, event, *args, **kwargs)
+
+    return wrapper
 
 
 class AUSFOperatorCharm(CharmBase):
     """Main class to describe juju event handling for the SD-Core AUSF operator."""
 
+    _EVENT_HANDLERS = (
+        ("on.ausf_pebble_ready", "_configure_ausf"),
+        ("on.fiveg_nrf_relation_joined", "_configure_ausf"),
+        ("_nrf_requires.on.nrf_available", "_configure_ausf"),
+        ("on.certificates_relation_created", "_on_certificates_relation_created"),
+        ("on.certificates_relation_joined", "_on_certificates_relation_joined"),
+        ("on.certificates_relation_broken", "_on_certificates_relation_broken"),
+        ("_certificates.on.certificate_available", "_on_certificate_available"),
+        ("_certificates.on.certificate_expiring", "_on_certificate_expiring"),
+    )
+
     def __init__(self, *args) -> None:
         super().__init__(*args)
         if not self.unit.is_leader():
             raise NotImplementedError("Scaling is not implemented for this charm")
         self._container_name = self._service_name = "ausf"
         self._container = self.unit.get_container(self._container_name)
+        self._cached_pod_ip: Optional[str] = None
+        self._cached_certs_dir: Optional[Set[str]] = None
+        self._last_pushed_config_sha: Optional[str] = None
+        self._layer_applied = False
+        self._private_key_cache: Optional[bytes] = None
+        self._csr_cache: Optional[str] = None
+        self._container_reachable_for: Optional[EventBase] = None
         self._nrf_requires = NRFRequires(charm=self, relation_name="fiveg_nrf")
         self._service_patcher = KubernetesServicePatch(
             charm=self,
@@ -60,25 +181,9 @@ class AUSFOperatorCharm(CharmBase):
         )
         self._certificates = TLSCertificatesRequiresV2(self, "certificates")
 
-        self.framework.observe(self.on.ausf_pebble_ready, self._configure_ausf)
-        self.framework.observe(self.on.fiveg_nrf_relation_joined, self._configure_ausf)
-        self.framework.observe(self._nrf_requires.on.nrf_available, self._configure_ausf)
-
-        self.framework.observe(
-            self.on.certificates_relation_created, self._on_certificates_relation_created
-        )
-        self.framework.observe(
-            self.on.certificates_relation_joined, self._on_certificates_relation_joined
-        )
-        self.framework.observe(
-            self.on.certificates_relation_broken, self._on_certificates_relation_broken
-        )
-        self.framework.observe(
-            self._certificates.on.certificate_available, self._on_certificate_available
-        )
-        self.framework.observe(
-            self._certificates.on.certificate_expiring, self._on_certificate_expiring
-        )
+        observe = self.framework.observe
+        for event_path, handler_name in self._EVENT_HANDLERS:
+            observe(attrgetter(event_path)(self), getattr(self, handler_name))
 
     def _configure_ausf(
         self,
@@ -86,64 +191,59 @@ class AUSFOperatorCharm(CharmBase):
     ) -> None:
         """Configure AUSF configuration file and pebble service.
 
+        Relation checks run before any Pebble call so that a missing relation or missing NRF
+        data is reported without contacting the container.
+
         Args:
             event (EventBase): Juju event
         """
-        if not self._container.can_connect():
-            self.unit.status = WaitingStatus("Waiting for container to start")
-            event.defer()
-            return
         if not self._relation_created("fiveg_nrf"):
             self.unit.status = BlockedStatus("Waiting for fiveg_nrf relation")
             return
-        if not self._nrf_data_is_available:
+        nrf_url = self._nrf_requires.nrf_url
+        if not nrf_url:
             self.unit.status = WaitingStatus("Waiting for NRF data to be available")
             event.defer()
             return
+        if not self._container_is_reachable(event):
+            self.unit.status = WaitingStatus("Waiting for container to start")
+            event.defer()
+            return
         if not self._container.exists(path=CONFIG_DIR):
             self.unit.status = WaitingStatus("Waiting for storage to be attached")
             event.defer()
             return
-        if not _get_pod_ip():
+        pod_ip = self._pod_ip
+        if not pod_ip:
             self.unit.status = WaitingStatus("Waiting for pod IP address to be available")
             event.defer()
             return
-        config_file_changed = self._apply_ausf_config()
+        config_file_changed = self._apply_ausf_config(pod_ip=pod_ip, nrf_url=nrf_url)
         self._configure_ausf_service(force_restart=config_file_changed)
         self.unit.status = ActiveStatus()
 
+    @_require_container
     def _on_certificates_relation_created(self, event: EventBase) -> None:
         """Generates Private key."""
-        if not self._container.can_connect():
-            event.defer()
-            return
         self._generate_private_key()
 
+    @_require_container
     def _on_certificates_relation_broken(self, event: EventBase) -> None:
         """Deletes TLS related artifacts and reconfigures workload."""
-        if not self._container.can_connect():
-            event.defer()
-            return
-        self._delete_private_key()
-        self._delete_csr()
-        self._delete_certificate()
+        self._delete_tls_artifacts()
         self._configure_ausf(event)
 
+    @_require_container
     def _on_certificates_relation_joined(self, event: EventBase) -> None:
         """Generates CSR and requests new certificate."""
-        if not self._container.can_connect():
-            event.defer()
-            return
         if not self._private_key_is_stored():
             event.defer()
             return
         self._request_new_certificate()
 
+    @_require_container
     def _on_certificate_available(self, event: CertificateAvailableEvent) -> None:
         """Pushes certificate to workload and configures workload."""
-        if not self._container.can_connect():
-            event.defer()
-            return
         if not self._csr_is_stored():
             logger.warning("Certificate is available but no CSR is stored")
             return
@@ -153,11 +253,9 @@ class AUSFOperatorCharm(CharmBase):
         self._store_certificate(event.certificate)
         self._configure_ausf(event)
 
+    @_require_container
     def _on_certificate_expiring(self, event: CertificateExpiringEvent):
         """Requests new certificate."""
-        if not self._container.can_connect():
-            event.defer()
-            return
         if event.certificate != self._get_stored_certificate():
             logger.debug("Expiring certificate is not the one stored")
             return
@@ -179,89 +277,116 @@ class AUSFOperatorCharm(CharmBase):
         self._store_csr(csr)
         self._certificates.request_certificate_creation(certificate_signing_request=csr)
 
-    def _delete_private_key(self):
-        """Removes private key from workload."""
-        if not self._private_key_is_stored():
-            return
-        self._container.remove_path(path=f"{CERTS_DIR_PATH}/{PRIVATE_KEY_NAME}")
-        logger.info("Removed private key from workload")
-
-    def _delete_csr(self):
-        """Deletes CSR from workload."""
-        if not self._csr_is_stored():
-            return
-        self._container.remove_path(path=f"{CERTS_DIR_PATH}/{CSR_NAME}")
-        logger.info("Removed CSR from workload")
-
-    def _delete_certificate(self):
-        """Deletes certificate from workload."""
-        if not self._certificate_is_stored():
-            return
-        self._container.remove_path(path=f"{CERTS_DIR_PATH}/{CERTIFICATE_NAME}")
-        logger.info("Removed certificate from workload")
+    def _delete_tls_artifacts(self) -> None:
+        """Removes private key, CSR and certificate from workload."""
+        certs_dir = self._list_certs_dir()
+        stored_artifacts = sorted(certs_dir.intersection(_TLS_ARTIFACT_PATHS))
+        for artifact in stored_artifacts:
+            self._container.remove_path(path=_TLS_ARTIFACT_PATHS[artifact])
+            certs_dir.discard(artifact)
+        self._private_key_cache = None
+        self._csr_cache = None
+        if stored_artifacts:
+            logger.info("Removed %s from workload", ", ".join(stored_artifacts))
+
+    def _list_certs_dir(self) -> Set[str]:
+        """Returns the names of the files stored in the workload's certificates directory.
+
+        The directory is listed once per charm instance; the charm keeps the result up to date
+        whenever it stores or removes a TLS artifact.
+        """
+        if self._cached_certs_dir is None:
+            try:
+                files = self._container.list_files(CERTS_DIR_PATH)
+            except APIError as err:
+                if err.code != 404:
+                    raise err
+                files = []
+            self._cached_certs_dir = {file.name for file in files}
+        return self._cached_certs_dir
 
     def _private_key_is_stored(self) -> bool:
         """Returns whether private key is stored in workload."""
-        return self._container.exists(path=f"{CERTS_DIR_PATH}/{PRIVATE_KEY_NAME}")
+        return PRIVATE_KEY_NAME in self._list_certs_dir()
 
     def _csr_is_stored(self) -> bool:
         """Returns whether CSR is stored in workload."""
-        return self._container.exists(path=f"{CERTS_DIR_PATH}/{CSR_NAME}")
+        return CSR_NAME in self._list_certs_dir()
 
     def _get_stored_certificate(self) -> str:
         """Returns stored certificate."""
-        return str(self._container.pull(path=f"{CERTS_DIR_PATH}/{CERTIFICATE_NAME}").read())
+        return cast(str, self._container.pull(path=_CERT_PATH).read())
 
     def _get_stored_csr(self) -> str:
         """Returns stored CSR."""
-        return str(self._container.pull(path=f"{CERTS_DIR_PATH}/{CSR_NAME}").read())
+        csr = self._csr_cache
+        if csr is None:
+            csr = cast(str, self._container.pull(path=_CSR_PATH).read())
+            self._csr_cache = csr
+        return csr
 
     def _get_stored_private_key(self) -> bytes:
         """Returns stored private key."""
-        return str(
-            self._container.pull(path=f"{CERTS_DIR_PATH}/{PRIVATE_KEY_NAME}").read()
-        ).encode()
+        private_key = self._private_key_cache
+        if private_key is None:
+            private_key = cast(
+                bytes, self._container.pull(path=_PRIV_KEY_PATH, encoding=None).read()
+            )
+            self._private_key_cache = private_key
+        return private_key
 
     def _certificate_is_stored(self) -> bool:
         """Returns whether certificate is stored in workload."""
-        return self._container.exists(path=f"{CERTS_DIR_PATH}/{CERTIFICATE_NAME}")
+        return CERTIFICATE_NAME in self._list_certs_dir()
 
     def _store_certificate(self, certificate: str) -> None:
         """Stores certificate in workload."""
-        self._container.push(path=f"{CERTS_DIR_PATH}/{CERTIFICATE_NAME}", source=certificate)
+        self._container.push(path=_CERT_PATH, source=certificate)
+        self._list_certs_dir().add(CERTIFICATE_NAME)
         logger.info("Pushed certificate pushed to workload")
 
     def _store_private_key(self, private_key: bytes) -> None:
         """Stores private key in workload."""
-        self._container.push(
-            path=f"{CERTS_DIR_PATH}/{PRIVATE_KEY_NAME}",
-            source=private_key.decode(),
-        )
+        self._container.push(path=_PRIV_KEY_PATH, source=private_key)
+        self._list_certs_dir().add(PRIVATE_KEY_NAME)
+        self._private_key_cache = private_key
         logger.info("Pushed private key to workload")
 
     def _store_csr(self, csr: bytes) -> None:
         """Stores CSR in workload."""
-        self._container.push(path=f"{CERTS_DIR_PATH}/{CSR_NAME}", source=csr.decode().strip())
+        stored_csr = csr.strip()
+        self._container.push(path=_CSR_PATH, source=stored_csr)
+        self._list_certs_dir().add(CSR_NAME)
+        self._csr_cache = stored_csr.decode()
         logger.info("Pushed CSR to workload")
 
-    def _apply_ausf_config(self) -> bool:
+    def _apply_ausf_config(self, *, pod_ip: str, nrf_url: str) -> bool:
         """Generate and push AUSF configuration file.
 
+        Args:
+            pod_ip (str): IP of the AUSF pod.
+            nrf_url (str): URL of the NRF.
+
         Returns:
             bool: True if the configuration file was changed.
         """
         content = self._render_config_file(
             ausf_group_id=AUSF_GROUP_ID,
-            ausf_ip=_get_pod_ip(),  # type: ignore[arg-type]
-            nrf_url=self._nrf_requires.nrf_url,
+            ausf_ip=pod_ip,
+            nrf_url=nrf_url,
             sbi_port=SBI_PORT,
             scheme="https" if self._certificate_is_stored() else "http",
         )
-        if not self._config_file_content_matches(content):
+        content_sha = hashlib.sha256(content.encode()).hexdigest()
+        if content_sha == self._last_pushed_config_sha:
+            return False
+        if not self._config_file_content_matches(content_sha):
             self._push_config_file(
                 content=content,
             )
+            self._last_pushed_config_sha = content_sha
             return True
+        self._last_pushed_config_sha = content_sha
         return False
 
     def _render_config_file(
@@ -282,27 +407,26 @@ class AUSFOperatorCharm(CharmBase):
             sbi_port (int): AUSF SBi port.
             scheme (str): SBI Interface scheme ("http" or "https")
         """
-        jinja2_environment = Environment(loader=FileSystemLoader(CONFIG_TEMPLATE_DIR))
-        template = jinja2_environment.get_template(CONFIG_TEMPLATE_NAME)
-        content = template.render(
+        return _CONFIG_TEMPLATE.format(
             ausf_group_id=ausf_group_id,
             ausf_ip=ausf_ip,
             nrf_url=nrf_url,
             sbi_port=sbi_port,
             scheme=scheme,
         )
-        return content
 
-    def _config_file_content_matches(self, content: str) -> bool:
-        """Return whether the config file content matches the provided content.
+    def _config_file_content_matches(self, content_sha: str) -> bool:
+        """Return whether the config file content matches the provided SHA-256 digest.
+
+        Args:
+            content_sha (str): Hex SHA-256 digest of the expected content.
 
         Returns:
             bool: Whether the config file content matches
         """
-        f"{CONFIG_DIR}/{CONFIG_FILE_NAME}"
         try:
-            existing_content = self._container.pull(path=f"{CONFIG_DIR}/{CONFIG_FILE_NAME}")
-            return existing_content.read() == content
+            existing_content = self._container.pull(path=_CONFIG_PATH, encoding=None)
+            return hashlib.sha256(cast(bytes, existing_content.read())).hexdigest() == content_sha
         except PathError:
             return False
 
@@ -316,7 +440,7 @@ class AUSFOperatorCharm(CharmBase):
             content (str): Content of the config file.
         """
         self._container.push(
-            path=f"{CONFIG_DIR}/{CONFIG_FILE_NAME}",
+            path=_CONFIG_PATH,
             source=content,
             make_dirs=True,
         )
@@ -332,12 +456,34 @@ class AUSFOperatorCharm(CharmBase):
             force_restart (bool): Allows for forcibly restarting the service even if Pebble plan
                 didn't change.
         """
+        if self._layer_applied and not force_restart:
+            return
         pebble_layer = self._pebble_layer
         plan = self._container.get_plan()
         if plan.services != pebble_layer.services or force_restart:
             self._container.add_layer(self._container_name, pebble_layer, combine=True)
             self._container.restart(self._service_name)
             logger.info("Restarted container %s", self._service_name)
+        self._layer_applied = True
+
+    def _container_is_reachable(self, event: EventBase) -> bool:
+        """Return whether the workload container can be reached while handling the event.
+
+        A successful check is remembered for the event being handled, so handlers that chain
+        into `_configure_ausf` query Pebble only once.
+
+        Args:
+            event (EventBase): Juju event being handled.
+
+        Returns:
+            bool: Whether the container can be reached.
+        """
+        if event is self._container_reachable_for:
+            return True
+        if not self._container.can_connect():
+            return False
+        self._container_reachable_for = event
+        return True
 
     def _relation_created(self, relation_name: str) -> bool:
         """Return True if the relation is created, False otherwise.
@@ -350,7 +496,7 @@ class AUSFOperatorCharm(CharmBase):
         """
         return bool(self.model.get_relation(relation_name))
 
-    @property
+    @cached_property
     def _pebble_layer(self) -> Layer:
         """Return pebble layer for the ausf container.
 
@@ -363,14 +509,14 @@ class AUSFOperatorCharm(CharmBase):
                     self._service_name: {
                         "override": "replace",
                         "startup": "enabled",
-                        "command": f"/bin/ausf --ausfcfg {CONFIG_DIR}/{CONFIG_FILE_NAME}",
+                        "command": f"/bin/ausf --ausfcfg {_CONFIG_PATH}",
                         "environment": self._ausf_environment_variables,
                     },
                 },
             }
         )
 
-    @property
+    @cached_property
     def _ausf_environment_variables(self) -> dict:
         """Return environment variables for the ausf container.
 
@@ -383,18 +529,20 @@ class AUSFOperatorCharm(CharmBase):
             "GRPC_GO_LOG_SEVERITY_LEVEL": "info",
             "GRPC_TRACE": "all",
             "GRPC_VERBOSITY": "DEBUG",
-            "POD_IP": _get_pod_ip(),
+            "POD_IP": self._pod_ip,
             "MANAGED_BY_CONFIG_POD": "true",
         }
 
     @property
-    def _nrf_data_is_available(self) -> bool:
-        """Return whether the NRF data is available.
+    def _pod_ip(self) -> Optional[str]:
+        """Return the pod IP, querying juju only until it is first available.
 
         Returns:
-            bool: Whether the NRF data is available.
+            str: The pod IP.
         """
-        return bool(self._nrf_requires.nrf_url)
+        if not self._cached_pod_ip:
+            self._cached_pod_ip = _get_pod_ip()
+        return self._cached_pod_ip
 
 
 def _get_pod_ip() -> Optional[str]:
@@ -403,8 +551,8 @@ def _get_pod_ip() -> Optional[str]:
     Returns:
         str: The pod IP.
     """
-    ip_address = check_output(["unit-get", "private-address"])
-    return str(IPv4Address(ip_address.decode().strip())) if ip_address else None
+    ip_address = check_output(_UNIT_GET_PRIVATE_ADDRESS).decode().strip()
+    return ip_address or None
 
 
 if __name__ == "__main__":  # pragma: no cover
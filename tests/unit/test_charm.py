@@ -8,6 +8,7 @@ import unittest
 from pathlib import Path
 from unittest.mock import Mock, patch
 
+import ops
 import pytest
 from ops.model import ActiveStatus, BlockedStatus, WaitingStatus
 from ops.pebble import Layer
@@ -43,6 +44,19 @@ class TestCharm(unittest.TestCase):
             BlockedStatus("Waiting for fiveg_nrf relation"),
         )
 
+    def test_given_fiveg_nrf_relation_not_created_and_cannot_connect_to_container_when_pebble_ready_then_status_is_blocked(  # noqa: E501
+        self,
+    ):
+        container = self.container.replace(can_connect=False)
+        state_in = State(leader=True, containers=[container])
+
+        state_out = self.ctx.run(container.pebble_ready_event, state_in)
+
+        self.assertEqual(
+            state_out.unit_status,
+            BlockedStatus("Waiting for fiveg_nrf relation"),
+        )
+
     def test_given_nrf_data_not_available_when_pebble_ready_then_status_is_waiting(
         self,
     ):
@@ -138,6 +152,33 @@ class TestCharm(unittest.TestCase):
             expected_content = expected.read().strip()
             self.assertEqual(actual_content, expected_content)
 
+    @patch("charm.check_output")
+    def test_given_certificate_stored_when_pebble_ready_then_config_file_uses_https_scheme(
+        self,
+        patch_check_output,
+    ):
+        config_dir = tempfile.TemporaryDirectory()
+        cert_dir = tempfile.TemporaryDirectory()
+        container = self.container.replace(
+            mounts={
+                "config_dir": Mount("/free5gc/config", config_dir.name),
+                "cert_dir": Mount("/support/TLS", cert_dir.name),
+            },
+        )
+        with open(Path(cert_dir.name) / "ausf.pem", "w") as ausf_pem_file:
+            ausf_pem_file.write("never gonna tell a lie and hurt you")
+        state_in = State(
+            leader=True,
+            containers=[container],
+            relations=[self.nrf_relation],
+        )
+        patch_check_output.return_value = b"1.1.1.1"
+
+        self.ctx.run(container.pebble_ready_event, state_in)
+
+        with open(Path(config_dir.name) / "ausfcfg.conf") as actual:
+            self.assertIn("scheme: https", actual.read())
+
     @patch("charm.check_output")
     def test_given_relation_available_and_config_pushed_when_pebble_ready_then_pebble_layer_is_added_correctly(  # noqa: E501
         self,
@@ -223,6 +264,26 @@ class TestCharm(unittest.TestCase):
             WaitingStatus("Waiting for pod IP address to be available"),
         )
 
+    @patch("charm.check_output")
+    def test_relations_available_when_pebble_ready_then_pod_ip_is_queried_once(
+        self,
+        patch_check_output,
+    ):
+        config_dir = tempfile.TemporaryDirectory()
+        container = self.container.replace(
+            mounts={"config_dir": Mount("/free5gc/config", config_dir.name)},
+        )
+        state_in = State(
+            leader=True,
+            containers=[container],
+            relations=[self.nrf_relation],
+        )
+        patch_check_output.return_value = "1.1.1.1".encode()
+
+        self.ctx.run(container.pebble_ready_event, state_in)
+
+        patch_check_output.assert_called_once_with(("unit-get", "private-address"))
+
     @patch("ops.model.Container.restart")
     @patch("charm.check_output")
     def test_relations_available_and_config_pushed_and_pebble_updated_when_pebble_ready_then_service_is_restarted(  # noqa: E501
@@ -292,6 +353,126 @@ class TestCharm(unittest.TestCase):
 
         patch_restart.assert_not_called()
 
+    @patch("ops.model.Container.push", autospec=True, side_effect=ops.model.Container.push)
+    @patch("ops.model.Container.pull", autospec=True, side_effect=ops.model.Container.pull)
+    @patch("charm.check_output")
+    def test_given_deferred_pebble_ready_when_nrf_available_then_config_file_is_pulled_and_pushed_once(  # noqa: E501
+        self,
+        patch_check_output,
+        patch_pull,
+        patch_push,
+    ):
+        config_dir = tempfile.TemporaryDirectory()
+        container = self.container.replace(
+            mounts={"config_dir": Mount("/free5gc/config", config_dir.name)},
+        )
+        state_in = State(
+            leader=True,
+            containers=[container],
+            relations=[self.nrf_relation],
+            deferred=[
+                container.pebble_ready_event.deferred(handler=AUSFOperatorCharm._configure_ausf)
+            ],
+        )
+        patch_check_output.return_value = b"1.1.1.1"
+
+        self.ctx.run(self.nrf_relation.changed_event, state_in)
+
+        config_pulls = [
+            call
+            for call in patch_pull.call_args_list
+            if call.kwargs["path"] == "/free5gc/config/ausfcfg.conf"
+        ]
+        config_pushes = [
+            call
+            for call in patch_push.call_args_list
+            if call.kwargs["path"] == "/free5gc/config/ausfcfg.conf"
+        ]
+        self.assertEqual(len(config_pulls), 1)
+        self.assertEqual(len(config_pushes), 1)
+
+    @patch("ops.model.Container.restart")
+    @patch("charm.check_output")
+    def test_given_deferred_pebble_ready_when_certificate_available_then_https_config_is_pushed_and_service_restarted_again(  # noqa: E501
+        self,
+        patch_check_output,
+        patch_restart,
+    ):
+        csr = "never gonna make you cry"
+        certificate = "Whatever certificate content"
+        config_dir = tempfile.TemporaryDirectory()
+        cert_dir = tempfile.TemporaryDirectory()
+        container = self.container.replace(
+            mounts={
+                "config_dir": Mount("/free5gc/config", config_dir.name),
+                "cert_dir": Mount("/support/TLS", cert_dir.name),
+            },
+        )
+        with open(Path(cert_dir.name) / "ausf.csr", "w") as ausf_csr_file:
+            ausf_csr_file.write(csr)
+        tls_relation = Relation(
+            endpoint="certificates",
+            remote_app_name="tls-provider",
+            local_unit_data={
+                "certificate_signing_requests": json.dumps([{"certificate_signing_request": csr}])
+            },
+            remote_app_data={
+                "certificates": json.dumps(
+                    [
+                        {
+                            "certificate": certificate,
+                            "certificate_signing_request": csr,
+                            "ca": "abc",
+                            "chain": ["abc", "def"],
+                        }
+                    ]
+                )
+            },
+        )
+        state_in = State(
+            leader=True,
+            containers=[container],
+            relations=[self.nrf_relation, tls_relation],
+            deferred=[
+                container.pebble_ready_event.deferred(handler=AUSFOperatorCharm._configure_ausf)
+            ],
+        )
+        patch_check_output.return_value = b"1.1.1.1"
+
+        self.ctx.run(tls_relation.changed_event, state_in)
+
+        with open(Path(config_dir.name) / "ausfcfg.conf") as actual:
+            self.assertIn("scheme: https", actual.read())
+        self.assertEqual(patch_restart.call_count, 2)
+
+    @patch("ops.model.Container.get_plan", autospec=True, side_effect=ops.model.Container.get_plan)
+    @patch("ops.model.Container.restart")
+    @patch("charm.check_output")
+    def test_given_deferred_pebble_ready_when_nrf_available_then_pebble_plan_is_checked_and_service_restarted_once(  # noqa: E501
+        self,
+        patch_check_output,
+        patch_restart,
+        patch_get_plan,
+    ):
+        config_dir = tempfile.TemporaryDirectory()
+        container = self.container.replace(
+            mounts={"config_dir": Mount("/free5gc/config", config_dir.name)},
+        )
+        state_in = State(
+            leader=True,
+            containers=[container],
+            relations=[self.nrf_relation],
+            deferred=[
+                container.pebble_ready_event.deferred(handler=AUSFOperatorCharm._configure_ausf)
+            ],
+        )
+        patch_check_output.return_value = b"1.1.1.1"
+
+        self.ctx.run(self.nrf_relation.changed_event, state_in)
+
+        patch_get_plan.assert_called_once()
+        patch_restart.assert_called_once_with("ausf")
+
     @patch("ops.model.Container.restart")
     @patch("charm.check_output")
     def test_config_pushed_but_content_changed_and_layer_already_applied_when_pebble_ready_then_ausf_service_is_restarted(  # noqa: E501
@@ -356,6 +537,23 @@ class TestCharm(unittest.TestCase):
             "nrf_available",
         )
 
+    def test_given_cannot_connect_to_container_when_on_certificates_relation_created_then_event_is_deferred(  # noqa: E501
+        self,
+    ):
+        container = self.container.replace(can_connect=False)
+        state_in = State(
+            leader=True,
+            containers=[container],
+            relations=[self.nrf_relation, self.tls_relation],
+        )
+
+        state_out = self.ctx.run(self.tls_relation.created_event, state_in)
+
+        self.assertEqual(
+            state_out.deferred[0].name,
+            "certificates_relation_created",
+        )
+
     @patch("charm.generate_private_key")
     def test_given_can_connect_when_on_certificates_relation_created_then_private_key_is_generated(
         self, patch_generate_private_key
@@ -410,6 +608,36 @@ class TestCharm(unittest.TestCase):
         with pytest.raises(FileNotFoundError):
             open(Path(cert_dir.name) / "ausf.csr")
 
+    @patch("ops.model.Container.can_connect")
+    @patch("charm.check_output")
+    def test_given_certificates_are_stored_when_on_certificates_relation_broken_then_container_connectivity_is_checked_once(  # noqa: E501
+        self,
+        patch_check_output,
+        patch_can_connect,
+    ):
+        patch_check_output.return_value = b"1.1.1.1"
+        patch_can_connect.return_value = True
+        config_dir = tempfile.TemporaryDirectory()
+        cert_dir = tempfile.TemporaryDirectory()
+        container = self.container.replace(
+            mounts={
+                "config_dir": Mount("/free5gc/config", config_dir.name),
+                "cert_dir": Mount("/support/TLS", cert_dir.name),
+            },
+        )
+        with open(Path(cert_dir.name) / "ausf.pem", "w") as ausf_pem_file:
+            ausf_pem_file.write("never gonna run around and desert you")
+        state_in = State(
+            leader=True,
+            containers=[container],
+            relations=[self.nrf_relation, self.tls_relation],
+        )
+
+        state_out = self.ctx.run(self.tls_relation.broken_event, state_in)
+
+        self.assertEqual(state_out.unit_status, ActiveStatus())
+        patch_can_connect.assert_called_once()
+
     @patch(
         "charms.tls_certificates_interface.v2.tls_certificates.TLSCertificatesRequiresV2.request_certificate_creation",  # noqa: E501
         new=Mock,
@@ -465,6 +693,99 @@ class TestCharm(unittest.TestCase):
 
         patch_request_certificate_creation.assert_called_with(certificate_signing_request=csr)
 
+    @patch(
+        "charms.tls_certificates_interface.v2.tls_certificates.TLSCertificatesRequiresV2.request_certificate_creation",  # noqa: E501
+        new=Mock,
+    )
+    @patch("charm.generate_csr")
+    def test_given_private_key_exists_when_on_certificates_relation_joined_then_private_key_and_csr_are_kept_in_memory(  # noqa: E501
+        self, patch_generate_csr
+    ):
+        private_key = "never gonna let you down"
+        cert_dir = tempfile.TemporaryDirectory()
+        container = self.container.replace(
+            mounts={"cert_dir": Mount("/support/TLS", cert_dir.name)},
+        )
+        with open(Path(cert_dir.name) / "ausf.key", "w") as ausf_key_file:
+            ausf_key_file.write(private_key)
+        csr = b"whatever csr content"
+        patch_generate_csr.return_value = csr
+        state_in = State(
+            leader=True,
+            containers=[container],
+            relations=[self.nrf_relation, self.tls_relation],
+        )
+
+        def assert_artifacts_cached(charm: AUSFOperatorCharm):
+            self.assertEqual(charm._private_key_cache, private_key.encode())
+            self.assertEqual(charm._csr_cache, csr.decode())
+
+        self.ctx.run(self.tls_relation.joined_event, state_in, post_event=assert_artifacts_cached)
+
+    @patch(
+        "charms.tls_certificates_interface.v2.tls_certificates.TLSCertificatesRequiresV2.request_certificate_creation",  # noqa: E501
+        new=Mock,
+    )
+    @patch("charm.generate_csr")
+    @patch("charm.check_output")
+    def test_given_csr_stored_then_certificates_relation_broken_when_certificate_available_for_old_csr_then_certificate_is_not_pushed(  # noqa: E501
+        self,
+        patch_check_output,
+        patch_generate_csr,
+    ):
+        csr = "never gonna make you cry"
+        certificate = "Whatever certificate content"
+        cert_dir = tempfile.TemporaryDirectory()
+        container = self.container.replace(
+            mounts={"cert_dir": Mount("/support/TLS", cert_dir.name)},
+        )
+        with open(Path(cert_dir.name) / "ausf.key", "w") as ausf_key_file:
+            ausf_key_file.write("never gonna let you down")
+        patch_generate_csr.return_value = csr.encode()
+        patch_check_output.return_value = b"1.1.1.1"
+        tls_relation = Relation(
+            endpoint="certificates",
+            remote_app_name="tls-provider",
+            local_unit_data={
+                "certificate_signing_requests": json.dumps([{"certificate_signing_request": csr}])
+            },
+            remote_app_data={
+                "certificates": json.dumps(
+                    [
+                        {
+                            "certificate": certificate,
+                            "certificate_signing_request": csr,
+                            "ca": "abc",
+                            "chain": ["abc", "def"],
+                        }
+                    ]
+                )
+            },
+        )
+        state_in = State(
+            leader=True,
+            containers=[container],
+            relations=[self.nrf_relation, tls_relation],
+            deferred=[
+                tls_relation.joined_event.deferred(
+                    handler=AUSFOperatorCharm._on_certificates_relation_joined, event_id=1
+                ),
+                tls_relation.broken_event.deferred(
+                    handler=AUSFOperatorCharm._on_certificates_relation_broken, event_id=2
+                ),
+            ],
+        )
+
+        def assert_artifacts_not_cached(charm: AUSFOperatorCharm):
+            self.assertIsNone(charm._private_key_cache)
+            self.assertIsNone(charm._csr_cache)
+
+        self.ctx.run(tls_relation.changed_event, state_in, post_event=assert_artifacts_not_cached)
+
+        patch_generate_csr.assert_called_once()
+        with pytest.raises(FileNotFoundError):
+            open(Path(cert_dir.name) / "ausf.pem")
+
     @patch("charm.check_output")
     def test_given_csr_matches_stored_one_when_certificate_available_then_certificate_is_pushed(
         self,